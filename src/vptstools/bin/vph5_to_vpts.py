@@ -1,12 +1,17 @@
+import io
+import multiprocessing
 import os
-import tempfile
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from itertools import chain
 from functools import partial
-import shutil
-from pathlib import Path
-from datetime import date
+import zlib
+from datetime import date, datetime, timedelta, timezone
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import click
 from dotenv import load_dotenv
 import s3fs
@@ -27,8 +32,15 @@ AWS_PROFILE = os.environ.get("AWS_PROFILE", None)
 AWS_REGION = os.environ.get("AWS_REGION", "eu-west-1")
 
 MANIFEST_URL = f"s3://{INVENTORY_BUCKET}/{S3_BUCKET}/{S3_BUCKET}-hdf5-files-inventory"
-S3_BUCKET_CREATION = pd.Timestamp("2022-08-02 00:00:00", tz="UTC")
+S3_BUCKET_CREATION = datetime(2022, 8, 2, tzinfo=timezone.utc)
 MANIFEST_HOUR_OF_DAY = "01-00"
+DAILY_VPTS_DATE_REGEX = re.compile(r"_vpts_(\d{4})(\d{2})\d{2}\.csv$")
+STREAM_BLOCK_SIZE = 8 * 1024 * 1024  # >= 5MB, the minimal S3 multipart upload part size
+MAX_DAILY_WORKERS = 4  # concurrent radar-days to convert to daily VPTS
+MAX_DOWNLOAD_WORKERS = 16  # concurrent HDF5 downloads of a single radar-day
+# S3 metadata of a daily VPTS file describing the enlisted HDF5 files it was derived from
+DAILY_VPTS_H5_COUNT_KEY = "h5-file-count"
+DAILY_VPTS_H5_LAST_MODIFIED_KEY = "h5-last-modified"
 
 
 # Prepare SNS report handler
@@ -40,6 +52,219 @@ sns_report_exception = partial(report_click_exception_to_sns,
                                )
 
 
+def _download_h5(s3_client, h5_path):
+    """Download a HDF5 file from S3 into memory
+
+    Parameters
+    ----------
+    s3_client : boto3 S3 client
+        S3 client to download the HDF5 file
+    h5_path : OdimFilePath
+        Path of the HDF5 file on S3
+
+    Returns
+    -------
+    io.BytesIO
+        In-memory HDF5 file, named according to the file name of the HDF5 file
+    """
+    response = s3_client.get_object(
+        Bucket=S3_BUCKET, Key=f"{h5_path.s3_folder_path_h5}/{h5_path.file_name}"
+    )
+    h5_file = io.BytesIO(response["Body"].read())
+    h5_file.name = h5_path.file_name
+    return h5_file
+
+
+def _object_metadata(s3_client, key):
+    """Get the user-defined metadata of a file on S3 or None when it does not exist"""
+    try:
+        return s3_client.head_object(Bucket=S3_BUCKET, Key=key)["Metadata"]
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return None
+        raise
+
+
+def _create_daily_vpts(daily_vpts, inbo_s3, s3_client, force=False, process_pool=None):
+    """Convert the HDF5 files of a single radar-day to a daily VPTS file on S3
+
+    Parameters
+    ----------
+    daily_vpts : tuple
+        Directory info (source, file_type, radar_code, year, month, day) of the radar-day
+    inbo_s3 : s3fs.S3FileSystem
+        S3 file system to enlist and upload the files
+    s3_client : boto3 S3 client
+        S3 client to download the HDF5 files (thread-safe)
+    force : bool, default False
+        Recreate the daily VPTS file, even if its HDF5 files did not change
+    process_pool : concurrent.futures.ProcessPoolExecutor, optional
+        Process pool shared by all radar-days to parse the HDF5 files with. When None,
+        `vpts` creates a process pool for the radar-day itself.
+
+    Returns
+    -------
+    bool
+        True if the daily VPTS file was created, False if it was up to date
+    """
+    # Enlist files of the day to rerun (all the given day)
+    source, _, radar_code, year, month, day = daily_vpts
+    odim_path = OdimFilePath(source, radar_code, "vp", year, month, day)
+    # (refresh to not rely on a cached enlisting for the up to date check)
+    odim5_files = inbo_s3.ls(
+        f"{S3_BUCKET}/{odim_path.s3_folder_path_h5}", detail=True, refresh=True
+    )
+
+    # - skip the radar-day when the daily VPTS file was created from the same HDF5 files,
+    #   as stored in its metadata. The LastModified of the daily VPTS file itself can not
+    #   be used, as HDF5 files can be added between the enlisting and the upload.
+    source_metadata = {
+        DAILY_VPTS_H5_COUNT_KEY: str(len(odim5_files)),
+        DAILY_VPTS_H5_LAST_MODIFIED_KEY: max(
+            (h5_file["LastModified"].isoformat() for h5_file in odim5_files), default=""
+        ),
+    }
+    if not force and odim5_files:
+        daily_metadata = _object_metadata(s3_client, odim_path.s3_file_path_daily_vpts)
+        if daily_metadata is not None and all(
+            daily_metadata.get(key) == value for key, value in source_metadata.items()
+        ):
+            click.echo(f"Daily VPTS file {odim_path.s3_file_path_daily_vpts} is up to date, skip.")
+            return False
+    click.echo(f"Create daily VPTS file {odim_path.s3_file_path_daily_vpts}.")
+
+    # - download the files of the day into memory, concurrently as the many small
+    #   files make the download latency-bound instead of bandwidth-bound
+    h5_paths = [OdimFilePath.from_s3fs_enlisting(h5_file["name"]) for h5_file in odim5_files]
+    # s3f3 fails in wrapped moto environment; fall back to boto3 (thread-safe client)
+    with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+        h5_files = list(executor.map(partial(_download_h5, s3_client), h5_paths))
+
+    # - run VPTS on all downloaded files
+    df_vpts = vpts(h5_files, executor=process_pool)
+
+    # - write VPTS file to S3, together with the HDF5 files it was derived from
+    with inbo_s3.open(
+        f"{S3_BUCKET}/{odim_path.s3_file_path_daily_vpts}", "wb", Metadata=source_metadata
+    ) as daily_vpts_file:
+        vpts_to_csv(df_vpts, daily_vpts_file)
+    return True
+
+
+def _daily_vpts_files_by_month(s3_client, odim_paths):
+    """Enlist the daily VPTS files on S3 grouped by month
+
+    Each daily VPTS folder (one per source, radar and year) is enlisted only once
+    with a paginated ``list_objects_v2``, instead of enlisting it for each month.
+
+    Parameters
+    ----------
+    s3_client : boto3 S3 client
+        S3 client to enlist the daily VPTS files
+    odim_paths : iterable of OdimFilePath
+        Paths defining the daily VPTS folders to enlist
+
+    Returns
+    -------
+    dict
+        Sorted daily VPTS file keys for each
+        (source, radar_code, year, month) combination
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+    daily_vpts_files = defaultdict(list)
+    for prefix in {odim_path.s3_path_setup("daily") for odim_path in odim_paths}:
+        source, _, radar_code, _ = prefix.split("/")
+        for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=f"{prefix}/"):
+            for obj in page.get("Contents", []):
+                match = DAILY_VPTS_DATE_REGEX.search(obj["Key"])
+                if match:
+                    year, month = match.groups()
+                    daily_vpts_files[(source, radar_code, year, month)].append(obj["Key"])
+    return {key: sorted(files) for key, files in daily_vpts_files.items()}
+
+
+def _concat_daily_vpts(s3_client, daily_vpts_keys, monthly_vpts_key):
+    """Concatenate daily VPTS files to a gzip compressed monthly VPTS file on S3
+
+    The daily files are streamed as bytes in blocks, compressed and uploaded as
+    parts of a multipart upload. Only the header of the first daily file is kept,
+    all daily files are required to have the same header.
+    As the data itself is not parsed, memory usage is limited to a few blocks.
+
+    Parameters
+    ----------
+    s3_client : boto3 S3 client
+        S3 client to download the daily and upload the monthly VPTS file
+    daily_vpts_keys : list of str
+        Sorted S3 keys of the daily VPTS files
+    monthly_vpts_key : str
+        S3 key of the monthly VPTS file to create
+    """
+    if not daily_vpts_keys:
+        raise ValueError("No daily VPTS files to concatenate.")
+
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=S3_BUCKET, Key=monthly_vpts_key
+    )["UploadId"]
+    parts = []
+
+    def upload_part(body):
+        part_number = len(parts) + 1
+        response = s3_client.upload_part(
+            Bucket=S3_BUCKET,
+            Key=monthly_vpts_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    try:
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+        buffer = bytearray()
+        header = None
+        for daily_vpts_key in daily_vpts_keys:
+            body = s3_client.get_object(Bucket=S3_BUCKET, Key=daily_vpts_key)["Body"]
+            file_header = b""
+            in_header = True
+            for chunk in body.iter_chunks(STREAM_BLOCK_SIZE):
+                if in_header:
+                    end_of_header = chunk.find(b"\n") + 1
+                    if not end_of_header:
+                        file_header += chunk
+                        continue
+                    file_header += chunk[:end_of_header]
+                    chunk = chunk[end_of_header:]
+                    in_header = False
+                    # the bytes are concatenated as such, so the columns need to match
+                    if header is None:
+                        header = file_header
+                        buffer += compressor.compress(header)
+                    elif file_header != header:
+                        raise ValueError(
+                            f"Header of daily VPTS file {daily_vpts_key} differs "
+                            f"from the header of {daily_vpts_keys[0]}."
+                        )
+                buffer += compressor.compress(chunk)
+                if len(buffer) >= STREAM_BLOCK_SIZE:
+                    upload_part(bytes(buffer))
+                    buffer.clear()
+        buffer += compressor.flush()
+        upload_part(bytes(buffer))
+
+        s3_client.complete_multipart_upload(
+            Bucket=S3_BUCKET,
+            Key=monthly_vpts_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(
+            Bucket=S3_BUCKET, Key=monthly_vpts_key, UploadId=upload_id
+        )
+        raise
+
+
 @click.command(cls=catch_all_exceptions(click.Command, handler=sns_report_exception))  # Add SNS-reporting on exception
 @click.option(
     "--modified-days-ago",
@@ -47,7 +272,8 @@ sns_report_exception = partial(report_click_exception_to_sns,
     default=2,
     type=int,
     help="Range of HDF5 VP files to include, i.e. files modified between now and N"
-    "modified-days-ago. If 0, all HDF5 files in the bucket will be included.",
+    "modified-days-ago. If 0, all HDF5 files in the bucket will be included and all daily "
+    "VPTS files are recreated (implies --force).",
 )
 @click.option(
     "--path-s3-folder",
@@ -56,7 +282,23 @@ sns_report_exception = partial(report_click_exception_to_sns,
     help="Apply the conversion to VPTS to all files within a S3 sub-folders instead "
          "of using the modified date of the files. This option does not use the inventory files."
 )
-def cli(modified_days_ago, path_s3_folder=None):
+@click.option(
+    "--radar-code",
+    "radar_codes",
+    type=str,
+    multiple=True,
+    help="Only convert the HDF5 files of the given radar, e.g. bejab. Can be used multiple times "
+         "to include multiple radars. By default, all radars are included."
+)
+@click.option(
+    "--force",
+    "force",
+    is_flag=True,
+    help="Recreate the daily VPTS files, even if their HDF5 files did not change. "
+         "By default, daily VPTS files which are up to date are not recreated. "
+         "Implied when --modified-days-ago is 0."
+)
+def cli(modified_days_ago, path_s3_folder=None, radar_codes=(), force=False):
     """Convert and aggregate HDF5 VP files to daily and monthly VPTS CSV files on S3 bucket
 
     Check the latest modified
@@ -69,6 +311,9 @@ def cli(modified_days_ago, path_s3_folder=None):
 
     When using the `path_s3_folder` option, the modified date is not used, but a recursive search within the given s3
     path is applied to define the daily/monthly files to recreate.
+    In both cases, a daily file derived from the same HDF5 files (same number of files
+    and latest modified date) is not recreated, unless the `force` option is used or
+    `modified_days_ago` is 0.
     E.g. `vph5_to_vpts --path-s3-folder uva/hdf5/nldhl/2019` or
     `vph5_to_vpts --path-s3-folder baltrad/hdf5/bejab/2022/10`.
 
@@ -87,6 +332,8 @@ def cli(modified_days_ago, path_s3_folder=None):
     - ``AWS_PROFILE``: AWS profile (mainly useful for local development when
       working with multiple AWS profiles)
     """
+    # radar codes parsed from the file names are lowercase
+    radar_codes = frozenset(radar_code.lower() for radar_code in radar_codes)
     if AWS_PROFILE:
         storage_options = {"profile": AWS_PROFILE}
         boto3_options = {"profile_name": AWS_PROFILE}
@@ -94,28 +341,34 @@ def cli(modified_days_ago, path_s3_folder=None):
         storage_options = dict()
         boto3_options = dict()
 
+    # Single S3 file system and client (with their connection pools) reused by all steps
+    inbo_s3 = s3fs.S3FileSystem(**storage_options)
+    # PATCH TO OVERCOME RECURSIVE s3fs in wrapped context
+    session = boto3.Session(**boto3_options)
+    s3_client = session.client(
+        "s3", config=Config(max_pool_connections=MAX_DAILY_WORKERS * MAX_DOWNLOAD_WORKERS)
+    )
+
     if path_s3_folder:
         click.echo(f"Applying the vpts conversion to all files within {path_s3_folder}. "
                    f"Ignoring the modified date of the files.")
 
-        inbo_s3 = s3fs.S3FileSystem(**storage_options)
         odim5_files = chain(inbo_s3.glob(f"{S3_BUCKET}/{path_s3_folder}/**/*.h5"),
                             inbo_s3.glob(f"{S3_BUCKET}/{path_s3_folder}/*.h5"))
 
-        days_to_create_vpts = (
-            pd.DataFrame(odim5_files, columns=["file"])
-            .set_index("file")
-            .groupby(extract_daily_group_from_path).size().reset_index()
-            .rename(
-                columns={
-                    "index": "directory",
-                    0: "file_count",
-                }
-            )
-        )
-        if len(days_to_create_vpts) == 0:
+        # Count files per radar-day, sorted by directory as for the manifest approach
+        day_counts = sorted(Counter(map(extract_daily_group_from_path, odim5_files)).items())
+        if not day_counts:
             raise Exception(f"No h5 files could be found in the current"
                             f" path '{S3_BUCKET}/{path_s3_folder}'.")
+        if radar_codes:
+            day_counts = [(day, count) for day, count in day_counts if day[2] in radar_codes]
+            if not day_counts:
+                raise Exception(f"No h5 files of the radar(s) {', '.join(sorted(radar_codes))} "
+                                f"could be found in the current path '{S3_BUCKET}/{path_s3_folder}'.")
+        days_to_create_vpts = pd.DataFrame(
+            day_counts, columns=["directory", "file_count"]
+        )
 
     else:
         # Load the S3 manifest of today
@@ -123,14 +376,16 @@ def cli(modified_days_ago, path_s3_folder=None):
                    f"since {modified_days_ago} days ago.")
 
         manifest_parent_key = (
-            pd.Timestamp.now(tz="utc").date() - pd.Timedelta("1day")
+            datetime.now(timezone.utc).date() - timedelta(days=1)
         ).strftime(f"%Y-%m-%dT{MANIFEST_HOUR_OF_DAY}Z")
         # define manifest of today
         s3_url = f"{MANIFEST_URL}/{manifest_parent_key}/manifest.json"
 
         click.echo(f"Extract coverage and days to recreate from manifest {s3_url}.")
         if modified_days_ago == 0:
-            modified_days_ago = (pd.Timestamp.now(tz="utc") - S3_BUCKET_CREATION).days + 1
+            modified_days_ago = (datetime.now(timezone.utc) - S3_BUCKET_CREATION).days + 1
+            # a full rerun recreates all daily files, also the ones which are up to date
+            force = True
             click.echo(
                 f"Recreate the full set of bucket files (files "
                 f"modified since {modified_days_ago}days). "
@@ -141,111 +396,71 @@ def cli(modified_days_ago, path_s3_folder=None):
             s3_url,
             modified_days_ago=f"{modified_days_ago}day",
             storage_options=storage_options,
+            radar_codes=radar_codes,
         )
 
         # Save coverage file to S3 bucket
         click.echo("Save coverage file to S3.")
         df_cov["directory"] = df_cov["directory"].str.join("/")
-        df_cov.to_csv(
-            f"s3://{S3_BUCKET}/coverage.csv", index=False, storage_options=storage_options
-        )
+        with inbo_s3.open(f"{S3_BUCKET}/coverage.csv", "w") as coverage_file:
+            df_cov.to_csv(coverage_file, index=False)
 
     # Run VPTS daily conversion for each radar-day with modified files
-    inbo_s3 = s3fs.S3FileSystem(**storage_options)
-    # PATCH TO OVERCOME RECURSIVE s3fs in wrapped context
-    session = boto3.Session(**boto3_options)
-    s3_client = session.client("s3")
-
     click.echo(f"Create {days_to_create_vpts.shape[0]} daily VPTS files.")
-    for j, daily_vpts in enumerate(days_to_create_vpts["directory"]):
-        try:
-            # Enlist files of the day to rerun (all the given day)
-            source, _, radar_code, year, month, day = daily_vpts
-            odim_path = OdimFilePath(source, radar_code, "vp", year, month, day)
-            odim5_files = inbo_s3.ls(f"{S3_BUCKET}/{odim_path.s3_folder_path_h5}")
-            click.echo(f"Create daily VPTS file {odim_path.s3_file_path_daily_vpts}.")
-            # - create tempdir
-            temp_folder_path = Path(tempfile.mkdtemp())
-
-            # - download the files of the day
-            h5_file_local_paths = []
-            for i, file_key in enumerate(odim5_files):
-                h5_path = OdimFilePath.from_s3fs_enlisting(file_key)
-                h5_local_path = str(temp_folder_path / h5_path.file_name)
-                # inbo_s3.get_file(file_key, h5_local_path)
-                # s3f3 fails in wrapped moto environment; fall back to boto3
-                s3_client.download_file(
-                    S3_BUCKET,
-                    f"{h5_path.s3_folder_path_h5}/{h5_path.file_name}",
-                    h5_local_path,
-                )
-                h5_file_local_paths.append(h5_local_path)
-
-            # - run VPTS on all locally downloaded files
-            df_vpts = vpts(h5_file_local_paths)
-
-            # - save VPTS file locally
-            vpts_to_csv(df_vpts, temp_folder_path / odim_path.daily_vpts_file_name)
-
-            # - copy VPTS file to S3
-            inbo_s3.put(
-                str(temp_folder_path / odim_path.daily_vpts_file_name),
-                f"{S3_BUCKET}/{odim_path.s3_file_path_daily_vpts}",
-            )
-
-            # - remove tempdir with local files
-            shutil.rmtree(temp_folder_path)
-        except Exception as exc:
-            click.echo(f"[WARNING] - During conversion from HDF5 files of {source}/{radar_code} at "
-                       f"{year}-{month}-{day} to daily VPTS file, the following error occurred: {type(exc).__name__} - {exc}.")
+    # Radar-days are independent; the threads handle the S3 I/O while the HDF5 parsing
+    # of all radar-days shares a single process pool sized to the CPU count. The pool
+    # is spawned instead of forked, as forking a process running I/O threads is unsafe
+    process_pool = ProcessPoolExecutor(
+        max_workers=max(multiprocessing.cpu_count() - 1, 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    with process_pool, ThreadPoolExecutor(max_workers=MAX_DAILY_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                _create_daily_vpts, daily_vpts, inbo_s3, s3_client, force, process_pool
+            ): daily_vpts
+            for daily_vpts in days_to_create_vpts["directory"]
+        }
+        for future in as_completed(futures):
+            exc = future.exception()
+            if exc is not None:
+                source, _, radar_code, year, month, day = futures[future]
+                click.echo(f"[WARNING] - During conversion from HDF5 files of {source}/{radar_code} at "
+                           f"{year}-{month}-{day} to daily VPTS file, the following error occurred: "
+                           f"{type(exc).__name__} - {exc}.")
 
     click.echo("Finished creating daily VPTS files.")
 
     # Run VPTS monthly conversion for each radar-day with modified files
     # TODO - abstract monthly procedure to separate functionality
-    months_to_create_vpts = days_to_create_vpts
-    months_to_create_vpts["directory"] = months_to_create_vpts["directory"].apply(
-        lambda x: x[:-1]
-    )  # remove day
-    months_to_create_vpts = (
-        months_to_create_vpts.groupby("directory").size().reset_index()
+    # unique radar-months (directory without the day), without altering the days
+    months_to_create_vpts = sorted(
+        {directory[:-1] for directory in days_to_create_vpts["directory"]}
+    )
+
+    # Enlist the available daily files once for all months instead of for each month
+    daily_vpts_files = _daily_vpts_files_by_month(
+        s3_client,
+        [
+            OdimFilePath(source, radar_code, "vp", year, month, "01")
+            for source, _, radar_code, year, month in months_to_create_vpts
+        ],
     )
 
-    click.echo(f"Create {months_to_create_vpts.shape[0]} monthly VPTS files.")
-    for j, monthly_vpts in enumerate(months_to_create_vpts["directory"]):
+    click.echo(f"Create {len(months_to_create_vpts)} monthly VPTS files.")
+    for j, monthly_vpts in enumerate(months_to_create_vpts):
         try:
             source, _, radar_code, year, month = monthly_vpts
             odim_path = OdimFilePath(source, radar_code, "vp", year, month, "01")
 
             click.echo(f"Create monthly VPTS file {odim_path.s3_file_path_monthly_vpts}.")
-            file_list = inbo_s3.ls(f"{S3_BUCKET}/{odim_path.s3_path_setup('daily')}")
-            files_to_concat = sorted(
-                [
-                    daily_vpts
-                    for daily_vpts in file_list
-                    if daily_vpts.find(f"{odim_path.year}{odim_path.month}") >= 0
-                ]
-            )
-            # do not parse Nan values, but keep all data as string
-            df_month = pd.concat(
-                [
-                    pd.read_csv(
-                        f"s3://{file_path}",
-                        dtype=str,
-                        keep_default_na=False,
-                        na_values=None,
-                    )
-                    for file_path in files_to_concat
-                ]
-            )
-            df_month.to_csv(
-                f"s3://{S3_BUCKET}/{odim_path.s3_file_path_monthly_vpts}",
-                index=False,
-                storage_options=storage_options,
+            files_to_concat = daily_vpts_files.get((source, radar_code, year, month), [])
+            _concat_daily_vpts(
+                s3_client, files_to_concat, odim_path.s3_file_path_monthly_vpts
             )
         except Exception as exc:
             click.echo(f"[WARNING] - During conversion from HDF5 files of {source}/{radar_code} at "
-                       f"{year}-{month}-{day} to monthly VPTS file, the following error occurred: {type(exc).__name__} - {exc}.")
+                       f"{year}-{month} to monthly VPTS file, the following error occurred: {type(exc).__name__} - {exc}.")
 
     click.echo("Finished creating monthly VPTS files.")
     click.echo("Finished VPTS update procedure.")
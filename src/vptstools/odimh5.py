@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import os
 from datetime import datetime
+from functools import cached_property
 from typing import Dict, List
 
 import h5py  # type: ignore
 import pytz
 
+# Files up to this size are read into memory at once with the HDF5 core driver
+CORE_DRIVER_MAX_SIZE = 64 * 1024 * 1024
+# Chunk cache settings used for files read from disk block by block
+CHUNK_CACHE_NBYTES = 32 * 1024 * 1024
+CHUNK_CACHE_NSLOTS = 10007
+
 
 class InvalidSourceODIM(Exception):
     """Wrong ODIM file"""
@@ -13,6 +21,14 @@ class InvalidSourceODIM(Exception):
     pass
 
 
+def _file_image(file_obj) -> bytes:
+    """Get the full content of a (binary) file-like object as bytes"""
+    if hasattr(file_obj, "getvalue"):
+        return file_obj.getvalue()
+    file_obj.seek(0)
+    return file_obj.read()
+
+
 class ODIMReader(object):
     """Read ODIM (HDF5) files with context manager
 
@@ -32,14 +48,39 @@ class ODIMReader(object):
 
         Parameters
         ----------
-        file_path : Path | str
-            HDF5 ODIM File path
+        file_path : Path | str | file-like
+            HDF5 ODIM File path or in-memory HDF5 ODIM file (e.g. io.BytesIO)
 
         Raises
         ------
         OSError: Unable to open file
+
+        Notes
+        -----
+        An in-memory file is opened as an HDF5 file image and a small file on disk
+        is read at once with the HDF5 core driver, as ODIM VP files are small and
+        all quantities of the file are read.
         """
-        self.hdf5 = h5py.File(file_path, mode="r")
+        if hasattr(file_path, "read"):
+            try:
+                self.hdf5 = h5py.File(h5py.h5f.open_file_image(_file_image(file_path)))
+            except ValueError as exc:
+                # an invalid file image only fails when used as file id
+                raise OSError(
+                    f"Unable to open file {getattr(file_path, 'name', file_path)} "
+                    f"(not a valid HDF5 file)"
+                ) from exc
+        elif os.path.getsize(file_path) <= CORE_DRIVER_MAX_SIZE:
+            self.hdf5 = h5py.File(
+                file_path, mode="r", driver="core", backing_store=False
+            )
+        else:
+            self.hdf5 = h5py.File(
+                file_path,
+                mode="r",
+                rdcc_nbytes=CHUNK_CACHE_NBYTES,
+                rdcc_nslots=CHUNK_CACHE_NSLOTS,
+            )
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
@@ -60,6 +101,21 @@ class ODIMReader(object):
         keys = list(self.hdf5)
         return [key for key in keys if "dataset" in key]
 
+    @cached_property
+    def quantities(self) -> Dict[str, str]:
+        """Get the data group name of each quantity in 'dataset1' as dictionary
+
+        The mapping is derived from the 'what' attributes only once per file.
+
+        Example: {'HGHT': 'data1', 'dd': 'data10', 'ff': 'data11',...}
+        """
+        dataset1 = self.hdf5["dataset1"]
+        return {
+            group["what"].attrs["quantity"].decode("utf8"): key
+            for key, group in dataset1.items()
+            if key != "what"
+        }
+
     @property
     def how(self) -> dict:
         """Get the 'how' as dictionary"""
@@ -1,12 +1,16 @@
+import os
 import re
 import urllib
 import json
-from pathlib import Path
 from dataclasses import dataclass
 
 import s3fs
 import pandas as pd
 
+ODIM_FILE_NAME_REGEX = re.compile(
+    r".*([a-zA-Z]{5})_([a-z]*)_(\d\d\d\d)(\d\d)(\d\d)T?(\d\d)(\d\d).*\.h5"
+)
+
 
 @dataclass(frozen=True)
 class OdimFilePath:
@@ -50,26 +54,20 @@ class OdimFilePath:
     @classmethod
     def from_file_name(cls, h5_file_path, source):
         """Initialize class from ODIM file path"""
-        return cls(source, *cls.parse_file_name(str(h5_file_path)))
+        return cls(source, *cls.parse_file_name(h5_file_path))
 
     @classmethod
     def from_inventory(cls, h5_file_path):
         """Initialize class from S3 inventory which contains source and file_type"""
-        return cls(
-            h5_file_path.split("/")[0],
-            *cls.parse_file_name(str(h5_file_path)),
-            h5_file_path.split("/")[1],
-        )
+        source, file_type = h5_file_path.split("/", 2)[:2]
+        return cls(source, *cls.parse_file_name(h5_file_path), file_type)
 
     @classmethod
     def from_s3fs_enlisting(cls, h5_file_path):
         """Initialize class from S3 inventory which contains bucket,
         source and file_type"""
-        return cls(
-            h5_file_path.split("/")[1],
-            *cls.parse_file_name(str(h5_file_path)),
-            h5_file_path.split("/")[2],
-        )
+        source, file_type = h5_file_path.split("/", 3)[1:3]
+        return cls(source, *cls.parse_file_name(h5_file_path), file_type)
 
     @staticmethod
     def parse_file_name(file_name):
@@ -78,7 +76,7 @@ class OdimFilePath:
 
         Parameters
         ----------
-        file_name : str
+        file_name : str | os.PathLike
             File name to be parsed. An eventual parent path and
             extension will be removed
 
@@ -96,13 +94,11 @@ class OdimFilePath:
         ``yyyymmdd`` the date and ``hhmm`` the hours and minutes.
         ``T`` is optional, ``extra`` is ignored.
         """
-
-        name_regex = re.compile(
-            r".*([a-zA-Z]{5})_([a-z]*)_(\d\d\d\d)(\d\d)(\d\d)T?(\d\d)(\d\d).*\.h5"
-        )
-        match = re.match(name_regex, file_name)
+        # called for each inventory item, so avoid the Path object overhead
+        file_name = os.fspath(file_name)
+        match = ODIM_FILE_NAME_REGEX.match(file_name)
         if match:
-            file_name = Path(file_name).name
+            file_name = os.path.basename(file_name)
             radar_code, data_type, year, month, day, hour, minute = match.groups()
             return radar_code.lower(), data_type, year, month, day, hour, minute, file_name
         else:
@@ -261,7 +257,7 @@ def _radar_day_counts_from_inventory(
 
 
 def _handle_inventory(
-    df, modified_days_ago, group_func=extract_daily_group_from_inventory
+    df, modified_days_ago, group_func=extract_daily_group_from_inventory, radar_codes=None
 ):
     """Extract modified days and coverage from a single inventory df
 
@@ -274,6 +270,9 @@ def _handle_inventory(
         pandas Timedelta description, e.g. 2days
     group_func : callable
         Function used to create countable groups
+    radar_codes : iterable of str, optional
+        Only keep the modified files of these radars, e.g. {"bejab", "bewid"}. The
+        coverage is not affected.
 
     Returns
     -------
@@ -298,12 +297,23 @@ def _handle_inventory(
 
     # Extract IDs latest N days modified files
     df_last_n_days = _last_modified_from_inventory(df, modified_days_ago)
+    if radar_codes:
+        # match the (lowercase) radar code parsed from the file name, as for the
+        # enlisted S3 files, only for the subset of modified files
+        radar_codes = {radar_code.lower() for radar_code in radar_codes}
+        df_last_n_days = df_last_n_days[
+            df_last_n_days["file"]
+            .map(lambda file_path: OdimFilePath.from_inventory(file_path).radar_code)
+            .isin(radar_codes)
+        ]
     # Count occurrences per radar-day -> coverage input
     df_coverage = _radar_day_counts_from_inventory(df, group_func)
     return df_coverage, df_last_n_days
 
 
-def handle_manifest(manifest_url, modified_days_ago="2day", storage_options=None):
+def handle_manifest(
+    manifest_url, modified_days_ago="2day", storage_options=None, radar_codes=None
+):
     """Extract modified days and coverage from a manifest file
 
     Parameters
@@ -317,6 +327,9 @@ def handle_manifest(manifest_url, modified_days_ago="2day", storage_options=None
         Additional parameters passed to the read_csv to access the
         S3 manifest files, eg. custom AWS profile options
         ({"profile": "inbo-prd"})
+    radar_codes : iterable of str, optional
+        Only include the modified files of these radars in the days to
+        create, e.g. {"bejab", "bewid"}. The coverage always contains all radars.
 
     Returns
     -------
@@ -354,6 +367,7 @@ def handle_manifest(manifest_url, modified_days_ago="2day", storage_options=None
                     chunk,
                     modified_days_ago,
                     group_func=extract_daily_group_from_inventory,
+                    radar_codes=radar_codes,
                 )
                 # Extract IDs latest N days modified files
                 df_last_n_days.append(df_last)
@@ -44,27 +44,46 @@ def _odim_get_variables(dataset, variable_mapping: dict, quantity: str) -> List[
     -----
     In order to handle the 'nodata' and 'undetect', a list overcomes casting as is done
     when using numpy in this case (and the non exsitence of Nan for integer in numpy).
+    The masking itself is done on the numpy array before converting to a list.
     """
-    data_group = variable_mapping[quantity]
+    data_group = dataset[variable_mapping[quantity]]
+    what = data_group["what"].attrs
 
-    gain = dataset[data_group]["what"].attrs["gain"]
-    offset = dataset[data_group]["what"].attrs["offset"]
+    gain = what["gain"]
+    offset = what["offset"]
 
-    nodata_val = dataset[data_group]["what"].attrs["nodata"]
-    undetect_val = dataset[data_group]["what"].attrs["undetect"]
+    nodata_val = what["nodata"]
+    undetect_val = what["undetect"]
 
     # Apply offset/gain while preserving the original variable datatype
-    variable_dtype = dataset[data_group]["data"].dtype
-    values = (
-        (dataset[data_group]["data"] * gain + offset)
-        .astype(variable_dtype)
-        .flatten()
-        .tolist()
+    data = data_group["data"][()]  # read the full dataset at once
+    values = (data * gain + offset).astype(data.dtype).flatten()
+    is_nodata = values == nodata_val
+    is_undetect = (values == undetect_val) & ~is_nodata
+    # use object array here to have mixed dtypes for the data versus nodata/undetect
+    values = values.astype(object)
+    values[is_nodata] = NODATA
+    values[is_undetect] = UNDETECT
+    return values.tolist()
+
+
+def _sort_vpts(df, vpts_csv_version):
+    """Sort VP or VPTS data according to the sorting rule of the VPTS CSV version
+
+    Only the sorting columns are casted to define the order, the data itself
+    is kept as str.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        DataFrame with VP or VPTS data as str
+    vpts_csv_version : AbstractVptsCsv
+        Ruleset with the VPTS CSV ruleset to use, e.g. v1.0
+    """
+    return df.sort_values(
+        by=list(vpts_csv_version.sort.keys()),
+        key=lambda column: column.astype(vpts_csv_version.sort[column.name]),
     )
-    # use regular list here to have mixed dtypes for the data versus nodata/undetect
-    values = [NODATA if value == nodata_val else value for value in values]
-    values = [UNDETECT if value == undetect_val else value for value in values]
-    return values
 
 
 @dataclass(frozen=True)
@@ -108,6 +127,17 @@ class BirdProfile:
     def to_vp(self, vpts_csv_version):
         """Convert profile data to a CSV
 
+        Parameters
+        ----------
+        vpts_csv_version : AbstractVptsCsv
+            Ruleset with the VPTS CSV ruleset to use, e.g. v1.0
+        """
+        # sort the data according to sorting rule
+        return _sort_vpts(self.to_table(vpts_csv_version), vpts_csv_version)
+
+    def to_table(self, vpts_csv_version):
+        """Convert profile data to an unsorted DataFrame all as string
+
         Parameters
         ----------
         vpts_csv_version : AbstractVptsCsv
@@ -122,17 +152,17 @@ class BirdProfile:
         """
         df = pd.DataFrame(vpts_csv_version.mapping(self), dtype=str)
 
-        df = df.replace(
-            {UNDETECT: vpts_csv_version.undetect, NODATA: vpts_csv_version.nodata}
-        )
-
-        # sort the data according to sorting rule
-        df = (
-            df.astype(vpts_csv_version.sort)
-            .sort_values(by=list(vpts_csv_version.sort.keys()))
-            .astype(str)
-        )
-
+        # only replace when the version representation differs from the internal one
+        replacements = {
+            value: replacement
+            for value, replacement in [
+                (UNDETECT, vpts_csv_version.undetect),
+                (NODATA, vpts_csv_version.nodata),
+            ]
+            if value != replacement
+        }
+        if replacements:
+            df = df.replace(replacements)
         return df
 
     @classmethod
@@ -147,19 +177,13 @@ class BirdProfile:
             URL or path to the source file from which the data were derived.
         """
         dataset1 = source_odim.hdf5["dataset1"]
-        variable_mapping = {
-            value[f"/dataset1/{key}"]["what"].attrs["quantity"].decode("utf8"): key
-            for key, value in dataset1.items()
-            if key != "what"
+        variable_mapping = source_odim.quantities
+        # Read each quantity once as a full column, the heights included
+        variables = {
+            quantity: _odim_get_variables(dataset1, variable_mapping, quantity=quantity)
+            for quantity in variable_mapping
         }
-        height_values = _odim_get_variables(dataset1, variable_mapping, quantity="HGHT")
-
-        variable_mapping.pop("HGHT")
-        variables = dict()
-        for variable in variable_mapping.keys():
-            variables[variable] = _odim_get_variables(
-                dataset1, variable_mapping, quantity=variable
-            )
+        height_values = variables.pop("HGHT")
 
         # Resolve hdf5 file full path if no source_file is provided by the user
         if not source_file:
@@ -182,15 +206,16 @@ def vp(file_path, vpts_csv_version="v1.0", source_file=""):
 
     Parameters
     ----------
-    file_path : Path
-        File Path of ODIM HDF5
+    file_path : Path | file-like
+        File Path of ODIM HDF5 or an in-memory ODIM HDF5 file (e.g. io.BytesIO)
     vpts_csv_version : str, default ""
         Ruleset with the VPTS CSV ruleset to use, e.g. v1.0
     source_file : str | callable
         URL or path to the source file from which the data were derived or
         a callable that converts the file_path to the source_file. See
         https://aloftdata.eu/vpts-csv/#source_file for more information on
-        the source file field.
+        the source file field. When empty, the file name itself is used, i.e. the
+        `name` attribute for in-memory files.
 
 
     Examples
@@ -205,6 +230,16 @@ def vp(file_path, vpts_csv_version="v1.0", source_file=""):
 
     >>> vp(file_path, source_file=lambda x: Path(x).name)
     """
+    vpts_csv = get_vpts_version(vpts_csv_version)
+    return _sort_vpts(_vp_table(file_path, vpts_csv, source_file), vpts_csv)
+
+
+def _vp_table(file_path, vpts_csv_version, source_file=""):
+    """Read a single ODIM HDF5 file into an unsorted DataFrame all as string"""
+    # Use the file name itself when no source_file is provided, also for named
+    # in-memory files, which have no meaningful HDF5 file name
+    if not source_file and hasattr(file_path, "name"):
+        source_file = _convert_to_source
     # Convert file_path into source_file using callable
     if callable(source_file):
         source_file = source_file(file_path)
@@ -212,26 +247,30 @@ def vp(file_path, vpts_csv_version="v1.0", source_file=""):
     with ODIMReader(file_path) as odim_vp:
         check_vp_odim(odim_vp)
         vp = BirdProfile.from_odim(odim_vp, source_file)
-    return vp.to_vp(get_vpts_version(vpts_csv_version))
+    return vp.to_table(vpts_csv_version)
 
 
 def _convert_to_source(file_path):
-    """Return the file name itself from a file path"""
-    return Path(file_path).name
+    """Return the file name itself from a file path or (named) file-like object"""
+    return Path(getattr(file_path, "name", file_path)).name
 
 
-def vpts(file_paths, vpts_csv_version="v1.0", source_file=None):
+def vpts(file_paths, vpts_csv_version="v1.0", source_file=None, executor=None):
     """Convert set of HDF5 files to a DataFrame all as string
 
     Parameters
     ----------
-    file_paths : Iterable of file paths
-        Iterable of ODIM HDF5 file paths
+    file_paths : Iterable of file paths | Iterable of file-like
+        Iterable of ODIM HDF5 file paths or in-memory ODIM HDF5 files (e.g.
+        io.BytesIO). In-memory files are named by their `name` attribute.
     vpts_csv_version : str
         Ruleset with the VPTS CSV ruleset to use, e.g. v1.0
     source_file : callable, optional
         A callable that converts the file_path to the source_file. When None,
         the file name itself (without parent folder reference) is used.
+    executor : concurrent.futures.Executor, optional
+        Executor (e.g. a ProcessPoolExecutor shared by multiple calls) to parse the
+        files with. When None, a process pool is created for this call only.
 
     Notes
     -----
@@ -254,25 +293,20 @@ def vpts(file_paths, vpts_csv_version="v1.0", source_file=None):
     if not source_file:
         source_file = _convert_to_source
 
-    cpu_count = max(multiprocessing.cpu_count() - 1, 1)
-    with multiprocessing.Pool(processes=cpu_count) as pool:
-        data = pool.map(
-            functools.partial(
-                vp, vpts_csv_version=vpts_csv_version, source_file=source_file
-            ),
-            file_paths,
-        )
-
-    vpts_ = pd.concat(data)
-
-    # Convert according to defined rule set
     vpts_csv = get_vpts_version(vpts_csv_version)
-    vpts_ = (
-        vpts_.astype(vpts_csv.sort)
-        .sort_values(by=list(vpts_csv.sort.keys()))
-        .astype(str)
+
+    # Workers return the unsorted per-file tables; all rows are sorted only once
+    vp_table = functools.partial(
+        _vp_table, vpts_csv_version=vpts_csv, source_file=source_file
     )
-    return vpts_
+    if executor is not None:
+        data = list(executor.map(vp_table, file_paths))
+    else:
+        cpu_count = max(multiprocessing.cpu_count() - 1, 1)
+        with multiprocessing.Pool(processes=cpu_count) as pool:
+            data = pool.map(vp_table, file_paths)
+
+    return _sort_vpts(pd.concat(data, copy=False), vpts_csv)
 
 
 def vpts_to_csv(df, file_path):
@@ -282,9 +316,14 @@ def vpts_to_csv(df, file_path):
     ----------
     df : pandas.DataFrame
         DataFrame with VP or VPTS data
-    file_path : Path | str
-        File path to store the VPTS file
+    file_path : Path | str | file-like
+        File path or (binary) file object to store the VPTS file
     """
+    # write to file-like objects as such, e.g. an opened S3 file
+    if hasattr(file_path, "write"):
+        df.to_csv(file_path, sep=CSV_FIELD_DELIMITER, encoding=CSV_ENCODING, index=False)
+        return
+
     # check for str input of Path
     if not isinstance(file_path, Path):
         file_path = Path(file_path)
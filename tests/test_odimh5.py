@@ -1,3 +1,5 @@
+import io
+
 import pytest
 
 from vptstools.odimh5 import ODIMReader, InvalidSourceODIM, check_vp_odim
@@ -15,6 +17,21 @@ def test_with_statement(file_path_pvol):
         assert hasattr(odim, "hdf5")
 
 
+def test_file_like(file_path_pvol):
+    """ODIMReader reads in-memory files the same as files on disk"""
+    with open(file_path_pvol, "rb") as f:
+        file_obj = io.BytesIO(f.read())
+    with ODIMReader(file_obj) as odim_mem, ODIMReader(file_path_pvol) as odim:
+        assert odim_mem.root_datetime == odim.root_datetime
+        assert odim_mem.dataset_names == odim.dataset_names
+
+
+def test_file_like_invalid():
+    """ODIMReader raises OSError for an invalid in-memory file"""
+    with pytest.raises(OSError):
+        ODIMReader(io.BytesIO(b"not hdf5"))
+
+
 def test_root_date_str(file_path_pvol):
     """The root_date_str property can be used to get the root date"""
     with ODIMReader(file_path_pvol) as odim:
@@ -51,6 +68,19 @@ def test_root_source_str(file_path_pvol):
         )
 
 
+def test_quantities(path_with_vp):
+    """The quantities property maps each quantity to its data group in dataset1"""
+    with ODIMReader(next(path_with_vp.rglob("*.h5"))) as odim:
+        quantities = odim.quantities
+        assert quantities["HGHT"] in odim.hdf5["dataset1"]
+        assert {"HGHT", "u", "v", "dd", "ff", "eta", "dens", "gap"}.issubset(quantities)
+        for quantity, data_group in quantities.items():
+            assert (
+                odim.hdf5["dataset1"][data_group]["what"].attrs["quantity"].decode("utf8")
+                == quantity
+            )
+
+
 def test_root_object_str(file_path_pvol):
     """The root_object_str property can be used to get the root object as a string"""
     with ODIMReader(file_path_pvol) as odim:
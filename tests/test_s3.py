@@ -508,6 +508,40 @@ class TestHandleManifest:
                 == set(df_cov.columns)
             )
 
+    def test_handle_manifest_radar_codes(self, s3_inventory):
+        """e2e test for the manifest/inventory handling functionality - subset of radars"""
+
+        df_result = self.df_result.iloc[[2], :].reset_index(drop=True)
+
+        with patch(
+            "pandas.Timestamp.now",
+            return_value=pd.Timestamp("2023-02-01 00:00:00", tz="UTC"),
+        ):
+            df_cov, days_to_create_vpts = handle_manifest(
+                "s3://dummy-inventory/dummy-aloftdata/dummy-aloftdata-hdf5-files-inventory/2023-02-01T01-00Z/manifest.json",
+                modified_days_ago="5days",
+                radar_codes={"nosta", "bejab"},
+            )
+            # Coverage returns the full inventory overview
+            pd.testing.assert_frame_equal(self.df_result, df_cov)
+            # Days to update only keeps modified files of the requested radars
+            pd.testing.assert_frame_equal(df_result, days_to_create_vpts)
+
+    def test_handle_manifest_radar_codes_case(self, s3_inventory):
+        """Radar codes are matched case-insensitive with the parsed file names"""
+        with patch(
+            "pandas.Timestamp.now",
+            return_value=pd.Timestamp("2023-02-01 00:00:00", tz="UTC"),
+        ):
+            _, days_to_create_vpts = handle_manifest(
+                "s3://dummy-inventory/dummy-aloftdata/dummy-aloftdata-hdf5-files-inventory/2023-02-01T01-00Z/manifest.json",
+                modified_days_ago="5days",
+                radar_codes={"NOSTA"},
+            )
+            pd.testing.assert_frame_equal(
+                self.df_result.iloc[[2], :].reset_index(drop=True), days_to_create_vpts
+            )
+
     def test_handle_manifest_none(self, s3_inventory):
         """e2e test for the manifest/inventory handling functionality - no data within"""
 
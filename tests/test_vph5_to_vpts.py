@@ -1,10 +1,22 @@
 import filecmp
+import gzip
+from datetime import datetime
 from unittest.mock import patch
 
+import pytest
 from click.testing import CliRunner
 import pandas as pd
 
-from vptstools.bin.vph5_to_vpts import cli
+from vptstools.vpts import vpts
+from vptstools.bin.vph5_to_vpts import cli, _concat_daily_vpts
+
+
+class FrozenDatetime(datetime):
+    """Datetime with a fixed 'now' to mock the current time of the CLI routine"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2023, 2, 2, tzinfo=tz)
 
 
 def test_help():
@@ -26,7 +38,7 @@ def test_e2e_cli(s3_inventory, path_inventory, tmp_path):
     with patch(
         "pandas.Timestamp.now",
         return_value=pd.Timestamp("2023-02-02 00:00:00", tz="UTC"),
-    ):
+    ), patch("vptstools.bin.vph5_to_vpts.datetime", FrozenDatetime):
 
         # Run CLI command `vph5_to_vpts` with limited modified period check to 3 days
         runner = CliRunner()
@@ -62,10 +74,69 @@ def test_e2e_cli(s3_inventory, path_inventory, tmp_path):
                 s3_inventory.download_fileobj(
                     "dummy-aloftdata", "baltrad/monthly/nosta/2023/nosta_vpts_202303.csv.gz", f
                 )
-            filecmp.cmp(
-                path_inventory / "nosta_vpts_202303.csv.gz",
-                tmp_path / "nosta_vpts_202303.csv.gz",
+            # (compare content, as the gzip header contains metadata such as the file name)
+            with gzip.open(path_inventory / "nosta_vpts_202303.csv.gz") as reference, \
+                    gzip.open(tmp_path / "nosta_vpts_202303.csv.gz") as result:
+                assert result.read() == reference.read()
+
+
+def test_e2e_cli_up_to_date(s3_inventory, sns):
+    """Daily VPTS files derived from the current HDF5 files are only recreated with force"""
+    with patch(
+        "pandas.Timestamp.now",
+        return_value=pd.Timestamp("2023-02-02 00:00:00", tz="UTC"),
+    ), patch("vptstools.bin.vph5_to_vpts.datetime", FrozenDatetime):
+        runner = CliRunner()
+        result = runner.invoke(cli, ["--modified-days-ago", str(3)])
+        assert "Create daily VPTS file baltrad/daily/nosta/2023/nosta_vpts_20230311.csv" in result.output
+
+        # rerun skips the daily files created by the first run
+        result = runner.invoke(cli, ["--modified-days-ago", str(3)])
+        assert result.exception is None
+        assert "nosta_vpts_20230311.csv is up to date, skip" in result.output
+        assert "Create 1 monthly VPTS files" in result.output
+
+        result = runner.invoke(cli, ["--modified-days-ago", str(3), "--force"])
+        assert result.exception is None
+        assert "Create daily VPTS file baltrad/daily/nosta/2023/nosta_vpts_20230311.csv" in result.output
+
+        # a full rerun implies force
+        result = runner.invoke(cli, ["--modified-days-ago", str(0)])
+        assert result.exception is None
+        assert "Create daily VPTS file baltrad/daily/nosta/2023/nosta_vpts_20230311.csv" in result.output
+
+
+def test_e2e_cli_h5_added_during_conversion(s3_inventory, path_inventory):
+    """A HDF5 file added after the enlisting of the day, but before the upload of the
+    daily VPTS file, triggers the recreation of the daily VPTS file on the next run"""
+    def vpts_adding_h5_file(*args, **kwargs):
+        with open(path_inventory / "vp" / "nosta_vp_20230311T231500Z_0xb.h5", "rb") as h5f:
+            s3_inventory.upload_fileobj(
+                h5f, "dummy-aloftdata",
+                "baltrad/hdf5/nosta/2023/03/11/nosta_vp_20230311T230500Z_0xb.h5"
             )
+        return vpts(*args, **kwargs)
+
+    with patch(
+        "pandas.Timestamp.now",
+        return_value=pd.Timestamp("2023-02-02 00:00:00", tz="UTC"),
+    ), patch("vptstools.bin.vph5_to_vpts.datetime", FrozenDatetime):
+        runner = CliRunner()
+        with patch("vptstools.bin.vph5_to_vpts.vpts", vpts_adding_h5_file):
+            result = runner.invoke(cli, ["--modified-days-ago", str(3)])
+        assert result.exception is None
+        daily_vpts_key = "baltrad/daily/nosta/2023/nosta_vpts_20230311.csv"
+        assert "T230500Z" not in s3_inventory.get_object(
+            Bucket="dummy-aloftdata", Key=daily_vpts_key
+        )["Body"].read().decode()
+
+        # the daily VPTS file is newer than the added HDF5 file, but is recreated anyway
+        result = runner.invoke(cli, ["--modified-days-ago", str(3)])
+        assert result.exception is None
+        assert f"Create daily VPTS file {daily_vpts_key}" in result.output
+        assert "T230500Z" in s3_inventory.get_object(
+            Bucket="dummy-aloftdata", Key=daily_vpts_key
+        )["Body"].read().decode()
 
 
 def test_e2e_cli_all(s3_inventory, path_inventory, tmp_path, sns):
@@ -80,7 +151,7 @@ def test_e2e_cli_all(s3_inventory, path_inventory, tmp_path, sns):
     with patch(
         "pandas.Timestamp.now",
         return_value=pd.Timestamp("2023-02-02 00:00:00", tz="UTC"),
-    ):
+    ), patch("vptstools.bin.vph5_to_vpts.datetime", FrozenDatetime):
         # Run CLI command `vph5_to_vpts` with limited modified period check to 3 days
         runner = CliRunner()
         result = runner.invoke(cli, ["--modified-days-ago", str(0)])
@@ -92,3 +163,46 @@ def test_e2e_cli_all(s3_inventory, path_inventory, tmp_path, sns):
         assert "[WARNING] - During conversion" in result.output
         assert result.exception is None
         # TODO - check if notification is sent to the SNS-TOPIC (currently only sent to mocked endpoint)
+
+
+def test_cli_path_s3_folder_radar_code_no_match(s3_inventory, sns):
+    """A radar filter matching none of the HDF5 files in the S3 folder is reported as such"""
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--path-s3-folder", "baltrad/hdf5/nosta/2023",
+                                 "--radar-code", "bejab"])
+    assert "No h5 files of the radar(s) bejab could be found" in result.output
+
+
+@pytest.fixture
+def s3_daily_vpts(s3_inventory):
+    """Mocked S3 bucket with a set of (minimal) daily VPTS files of a single month"""
+    daily_vpts = {
+        "baltrad/daily/nosta/2023/nosta_vpts_20230311.csv": b"radar,height\nnosta,0\nnosta,200\n",
+        "baltrad/daily/nosta/2023/nosta_vpts_20230312.csv": b"radar,height\nnosta,400\n",
+        "baltrad/daily/nosta/2023/nosta_vpts_20230313.csv": b"radar,dbz\nnosta,1\n",
+    }
+    for key, content in daily_vpts.items():
+        s3_inventory.put_object(Bucket="dummy-aloftdata", Key=key, Body=content)
+    with patch("vptstools.bin.vph5_to_vpts.S3_BUCKET", "dummy-aloftdata"):
+        yield s3_inventory, sorted(daily_vpts)
+
+
+def test_concat_daily_vpts(s3_daily_vpts, tmp_path):
+    """Daily files are concatenated with the header of the first file only"""
+    s3_client, daily_vpts_keys = s3_daily_vpts
+    _concat_daily_vpts(s3_client, daily_vpts_keys[:2], "monthly.csv.gz")
+
+    with open(tmp_path / "monthly.csv.gz", "wb") as f:
+        s3_client.download_fileobj("dummy-aloftdata", "monthly.csv.gz", f)
+    with gzip.open(tmp_path / "monthly.csv.gz") as monthly:
+        assert monthly.read() == b"radar,height\nnosta,0\nnosta,200\nnosta,400\n"
+
+
+def test_concat_daily_vpts_header_mismatch(s3_daily_vpts):
+    """Daily files with different headers can not be concatenated as bytes"""
+    s3_client, daily_vpts_keys = s3_daily_vpts
+    with pytest.raises(ValueError, match="differs from the header"):
+        _concat_daily_vpts(s3_client, daily_vpts_keys, "monthly.csv.gz")
+    assert "Contents" not in s3_client.list_objects_v2(
+        Bucket="dummy-aloftdata", Prefix="monthly.csv.gz"
+    )
@@ -1,5 +1,7 @@
 import datetime
 import dataclasses
+import io
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import pytest
@@ -235,6 +237,35 @@ class TestVpts:
         df_vpts = vpts(file_paths, vpts_version, _convert_to_source_s3)
         assert df_vpts["source_file"].str.startswith("s3://dummy-aloftdata/baltrad").all()
 
+    def test_vpts_file_like(self, vpts_version, path_with_vp):
+        """In-memory HDF5 files result in the same VPTS data as the file paths,
+        using the name of the file-like object as source_file"""
+        file_paths = sorted(path_with_vp.rglob("*.h5"))
+        h5_files = []
+        for file_path in file_paths:
+            h5_file = io.BytesIO(file_path.read_bytes())
+            h5_file.name = file_path.name
+            h5_files.append(h5_file)
+        df_vpts = vpts(h5_files, vpts_version)
+        pd.testing.assert_frame_equal(df_vpts, vpts(file_paths, vpts_version))
+
+    def test_vp_file_like(self, vpts_version, path_with_vp):
+        """In-memory HDF5 file results in the same VP data as the file path,
+        using the name of the file-like object as source_file"""
+        file_path = next(path_with_vp.rglob("*.h5"))
+        h5_file = io.BytesIO(file_path.read_bytes())
+        h5_file.name = file_path.name
+        df_vp = vp(h5_file, vpts_version)
+        assert (df_vp["source_file"] == file_path.name).all()
+        pd.testing.assert_frame_equal(df_vp, vp(file_path, vpts_version))
+
+    def test_vpts_executor(self, vpts_version, path_with_vp):
+        """A provided (shared) executor results in the same VPTS data"""
+        file_paths = sorted(path_with_vp.rglob("*.h5"))
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            df_vpts = vpts(file_paths, vpts_version, executor=executor)
+        pd.testing.assert_frame_equal(df_vpts, vpts(file_paths, vpts_version))
+
     def test_vp_invalid_file(self, vpts_version, path_with_wrong_h5):  # noqa
         """Invalid HDF5 VP file raises InvalidSourceODIM exceptin"""
         with pytest.raises(InvalidSourceODIM):
@@ -282,6 +313,17 @@ class TestVptsToCsv:
         vpts_to_csv(df_vpts, str(custom_folder / "vpts.csv"))
         assert custom_folder.exists()
 
+    def test_file_like(self, vpts_version, path_with_vp, tmp_path):
+        """To CSV supports writing to a binary file object as well"""
+        file_paths = sorted(path_with_vp.rglob("*.h5"))
+        df_vpts = vpts(file_paths, vpts_version)
+        vpts_to_csv(df_vpts, tmp_path / "vpts.csv")
+        with open(tmp_path / "vpts_file_like.csv", "wb") as vpts_file:
+            vpts_to_csv(df_vpts, vpts_file)
+        assert (tmp_path / "vpts_file_like.csv").read_bytes() == (
+            tmp_path / "vpts.csv"
+        ).read_bytes()
+
 
 class TestBirdProfile:
     def test_from_odim(self, path_with_vp):